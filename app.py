@@ -1,21 +1,36 @@
 import ccxt
+import logging
+import os
 import time
+import signal as os_signal
 import sqlite3
-import json
-import pytz
+import sys
+import threading
+import orjson
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from math import log, sqrt, exp, erf
+from functools import lru_cache
+from math import log, sqrt, exp
+from scipy.special import ndtr
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+TZ = ZoneInfo("America/Recife")
+SECONDS_PER_YEAR = 365 * 24 * 3600
 
 
 def norm_cdf(x):
     """
     Calcula a função de distribuição cumulativa (CDF) da distribuição normal padrão,
-    utilizando a função de erro (erf).
+    utilizando `scipy.special.ndtr`.
 
     :param x: Valor para o qual se calcula a CDF.
     :return: CDF do valor x.
     """
-    return (1.0 + erf(x / sqrt(2.0))) / 2.0
+    return float(ndtr(x))
 
 
 def black_scholes_price(S, K, T, r, sigma, option_type):
@@ -38,16 +53,158 @@ def black_scholes_price(S, K, T, r, sigma, option_type):
             return max(K - S, 0)
         else:
             return None
-    d1 = (log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt(T))
-    d2 = d1 - sigma * sqrt(T)
+    sigma_sqrt_T = sigma * sqrt(T)
+    d1 = (log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    # Valor presente do strike, comum às fórmulas de call e put.
+    K_disc = K * exp(-r * T)
+    # `norm_cdf` usa `ndtr`, que calcula a CDF normal diretamente em C e, ao contrário de
+    # (1 + erf(x/√2))/2, não perde precisão na cauda esquerda.
     if option_type == "call":
-        return S * norm_cdf(d1) - K * exp(-r * T) * norm_cdf(d2)
+        return S * norm_cdf(d1) - K_disc * norm_cdf(d2)
     elif option_type == "put":
-        return K * exp(-r * T) * norm_cdf(-d2) - S * norm_cdf(-d1)
+        return K_disc * norm_cdf(-d2) - S * norm_cdf(-d1)
     else:
         return None
 
 
+def _black_scholes_terms(S, K, T, r, sigma):
+    """
+    Calcula os termos comuns das fórmulas vetorizadas de Black–Scholes. Vencimentos já expirados
+    (T <= 0) são calculados com T = 1 (sem raiz/divisão por zero), de forma que todas as posições
+    seguem o mesmo caminho; o chamador substitui esses preços com `_intrinsic_if_expired`.
+
+    :param S: Preço atual do ativo subjacente.
+    :param K: Strike(s) da(s) opção(ões).
+    :param T: Tempo(s) até a expiração, em anos.
+    :param r: Taxa livre de risco anual (decimal).
+    :param sigma: Volatilidade(s) do ativo (IV) em decimal.
+    :return: Tupla (K, expired, d1, d2, K_disc) como arrays NumPy, em que expired indica T <= 0 e
+             K_disc é o valor presente do strike (K·e^(-rT)).
+    """
+    K = np.asarray(K, dtype=float)
+    T = np.asarray(T, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
+    expired = T <= 0
+    T = np.where(expired, 1.0, T)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma_sqrt_T = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+        d2 = d1 - sigma_sqrt_T
+    return K, expired, d1, d2, K * np.exp(-r * T)
+
+
+def _intrinsic_if_expired(price, expired, S, K, is_call):
+    """
+    Substitui, nas posições já expiradas, o preço de Black–Scholes pelo valor intrínseco
+    (mesmo comportamento da versão escalar).
+
+    :param price: Preços calculados por Black–Scholes.
+    :param expired: Máscara das posições com T <= 0.
+    :param S: Preço atual do ativo subjacente.
+    :param K: Strike(s) da(s) opção(ões).
+    :param is_call: True para call, False para put (escalar ou array booleano).
+    :return: Array NumPy com os preços finais.
+    """
+    intrinsic = np.where(is_call, np.maximum(S - K, 0.0), np.maximum(K - S, 0.0))
+    return np.where(expired, intrinsic, price)
+
+
+def black_scholes_price_vec(S, K, T, r, sigma, is_call):
+    """
+    Versão vetorizada de `black_scholes_price`: precifica várias opções em uma única passada NumPy.
+    Os argumentos K, T, sigma e is_call são combinados por broadcasting, de forma que é possível
+    precificar, por exemplo, todas as pernas (colunas) de todos os vencimentos (linhas) de uma só vez.
+
+    :param S: Preço atual do ativo subjacente.
+    :param K: Strike(s) da(s) opção(ões).
+    :param T: Tempo(s) até a expiração, em anos.
+    :param r: Taxa livre de risco anual (decimal).
+    :param sigma: Volatilidade(s) do ativo (IV) em decimal.
+    :param is_call: True para call, False para put (escalar ou array booleano).
+    :return: Array NumPy com os preços das opções.
+    """
+    K, expired, d1, d2, K_disc = _black_scholes_terms(S, K, T, r, sigma)
+    with np.errstate(invalid="ignore"):
+        price = np.where(
+            is_call,
+            S * ndtr(d1) - K_disc * ndtr(d2),
+            K_disc * ndtr(-d2) - S * ndtr(-d1),
+        )
+    return _intrinsic_if_expired(price, expired, S, K, is_call)
+
+
+def black_scholes_call_put(S, K, T, r, sigma):
+    """
+    Calcula, de uma só vez, os preços da call e da put com o mesmo strike e vencimento. d1, d2 e as
+    CDFs são avaliados apenas para a call; a put é obtida pela paridade put-call
+    (put = call - S + K·e^(-rT)). Aceita escalares ou arrays NumPy (broadcasting).
+
+    :param S: Preço atual do ativo subjacente.
+    :param K: Strike(s) da(s) opção(ões).
+    :param T: Tempo(s) até a expiração, em anos.
+    :param r: Taxa livre de risco anual (decimal).
+    :param sigma: Volatilidade(s) do ativo (IV) em decimal.
+    :return: Tupla (preço da call, preço da put), como arrays NumPy.
+    """
+    K, expired, d1, d2, K_disc = _black_scholes_terms(S, K, T, r, sigma)
+    with np.errstate(invalid="ignore"):
+        call = S * ndtr(d1) - K_disc * ndtr(d2)
+    put = call - S + K_disc
+    return _intrinsic_if_expired(call, expired, S, K, True), _intrinsic_if_expired(put, expired, S, K, False)
+
+
+@lru_cache(maxsize=512)
+def parse_expiration(expiration):
+    """
+    Converte uma data de expiração no formato 'YYYY-MM-DD' em um datetime com fuso horário (America/Recife).
+    O resultado é memorizado, pois as mesmas datas são analisadas várias vezes a cada ciclo.
+
+    :param expiration: Data de expiração no formato 'YYYY-MM-DD'.
+    :return: Datetime da expiração com fuso horário.
+    """
+    return datetime.fromisoformat(expiration).replace(tzinfo=TZ)
+
+
+def expiration_epoch(expiration):
+    """
+    Converte uma data de expiração no formato 'YYYY-MM-DD' em segundos desde a época Unix.
+
+    :param expiration: Data de expiração no formato 'YYYY-MM-DD'.
+    :return: Instante da expiração (inteiro) ou None se a data for inválida.
+    """
+    try:
+        return int(parse_expiration(expiration).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=512)
+def time_to_expiration_years(expiration, now_epoch_minute):
+    """
+    Calcula o tempo até a expiração em anos, a partir do minuto informado.
+    O cache é indexado por (expiração, minuto), de forma que os resultados expiram a cada minuto.
+
+    :param expiration: Data de expiração no formato 'YYYY-MM-DD'.
+    :param now_epoch_minute: Instante atual em minutos desde a época Unix (epoch // 60).
+    :return: Tempo até expiração (T) em anos, nunca negativo.
+    """
+    T_seconds = parse_expiration(expiration).timestamp() - now_epoch_minute * 60
+    return max(T_seconds / SECONDS_PER_YEAR, 0)
+
+
+def serialize_signal(signal_details):
+    """
+    Serializa os detalhes de um sinal em JSON com `orjson`. Escalares e arrays NumPy (ex.: prêmios
+    vindos de `black_scholes_price_vec`) são aceitos diretamente, sem conversão prévia para float.
+    Os bytes UTF-8 são gravados diretamente no banco (BLOB), sem decodificação para str.
+
+    :param signal_details: Dicionário com os detalhes do sinal.
+    :return: JSON em bytes (UTF-8).
+    """
+    return orjson.dumps(signal_details, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 class SignalDatabase:
     """
     Classe para gerenciamento do banco de dados SQLite que armazena os sinais gerados.
@@ -58,16 +215,76 @@ class SignalDatabase:
       - signal_legs: armazena os valores reais dos prêmios e as quantidades de cada perna associadas a um sinal.
     """
 
-    def __init__(self, db_name="signals.db"):
+    # Campos do sinal que já possuem coluna própria em 'signals' e, por isso, não são repetidos em signal_details.
+    COLUMN_FIELDS = frozenset({"asset", "strategy", "expiration", "premium"})
+
+    def __init__(self, db_name="signals.db", manual_checkpoint=False):
         """
         Inicializa a conexão com o banco de dados e cria as tabelas necessárias.
 
         :param db_name: Nome do arquivo SQLite.
+        :param manual_checkpoint: Se True, o checkpoint automático do WAL é desativado e o chamador
+                                  passa a ser responsável por chamar `checkpoint()` periodicamente.
         """
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        # `check_roll_signals` usa UPDATE ... RETURNING, disponível a partir do SQLite 3.35.
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            raise RuntimeError(
+                f"SQLite {sqlite3.sqlite_version} não suportado: é necessária a versão 3.35 ou superior."
+            )
+        self.db_name = db_name
+        self.manual_checkpoint = manual_checkpoint
+        # Cada thread usa sua própria conexão (aberta sob demanda em `conn`), em vez de uma única
+        # conexão compartilhada com check_same_thread=False.
+        self._local = threading.local()
         self.create_signals_table()
         self.create_leg_table()
 
+    @property
+    def conn(self):
+        """
+        Retorna a conexão SQLite da thread atual, abrindo-a na primeira utilização.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name)
+            # WAL + synchronous=NORMAL: commits não exigem fsync do journal completo a cada transação,
+            # e leitores de outras threads não bloqueiam o escritor.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            # Cache de páginas de ~20 MB e leitura do arquivo via mmap (até 256 MB).
+            conn.execute("PRAGMA cache_size=-20000")
+            conn.execute("PRAGMA mmap_size=268435456")
+            # Aguarda até 5 s por um lock de escrita de outra thread em vez de falhar imediatamente.
+            conn.execute("PRAGMA busy_timeout=5000")
+            if self.manual_checkpoint:
+                # Sem checkpoint automático: o WAL é transferido para o banco em `checkpoint()`, chamado pelo
+                # dono do banco fora da geração de sinais, e não no meio de um commit.
+                conn.execute("PRAGMA wal_autocheckpoint=0")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa várias operações de escrita (ex.: `insert_signals_bulk` + `insert_signal_legs_bulk`) em uma única
+        transação, com um único commit ao final. Em caso de erro, todas as alterações do bloco são desfeitas.
+        """
+        try:
+            yield self
+        except Exception:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+
+    def checkpoint(self):
+        """
+        Transfere o conteúdo do WAL para o arquivo do banco e trunca o WAL. Com `manual_checkpoint=True`,
+        substitui o checkpoint automático e deve ser chamado periodicamente, entre os ciclos de escrita.
+        """
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
     def create_signals_table(self):
         """
         Cria a tabela 'signals' se ela ainda não existir.
@@ -81,13 +298,50 @@ class SignalDatabase:
                 strategy TEXT,
                 expiration TEXT,
                 premium REAL,
-                signal_details TEXT,
+                signal_details BLOB,
                 roll_instruction TEXT,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'active'
+                status TEXT DEFAULT 'active',
+                exp_epoch INTEGER,
+                entry_epoch INTEGER
             )
         """
         )
+        # Bancos criados por versões anteriores: adiciona as colunas de época e as preenche a partir
+        # das colunas de texto (a expiração é a meia-noite no fuso America/Recife; o timestamp já está em UTC).
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(signals)")}
+        if "exp_epoch" not in columns:
+            cursor.execute("ALTER TABLE signals ADD COLUMN exp_epoch INTEGER")
+            cursor.execute("ALTER TABLE signals ADD COLUMN entry_epoch INTEGER")
+            cursor.execute(
+                """
+                UPDATE signals
+                SET exp_epoch = CAST(strftime('%s', expiration) AS INTEGER) - ?,
+                    entry_epoch = CAST(strftime('%s', timestamp) AS INTEGER)
+            """,
+                (int(datetime.now(TZ).utcoffset().total_seconds()),),
+            )
+        # Índice parcial único: só pode haver um sinal ativo por (ativo, estratégia, expiração). Além de servir
+        # à busca de duplicidade, permite que `insert_signals_bulk` use INSERT OR IGNORE sem consulta prévia.
+        # Substitui o índice parcial não único das versões anteriores.
+        cursor.execute("DROP INDEX IF EXISTS idx_signals_active")
+        if cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_signals_active_key'"
+        ).fetchone() is None:
+            # Bancos anteriores ao índice único podem ter sinais ativos duplicados (a verificação antiga não
+            # era atômica): mantém o mais antigo de cada chave e marca os demais como 'duplicate'.
+            cursor.execute(
+                """
+                UPDATE signals SET status = 'duplicate'
+                WHERE status = 'active'
+                  AND id NOT IN (
+                      SELECT MIN(id) FROM signals WHERE status = 'active' GROUP BY asset, strategy, expiration
+                  )
+            """
+            )
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_signals_active_key ON signals(asset, strategy, expiration) WHERE status='active'"
+        )
         self.conn.commit()
 
     def create_leg_table(self):
@@ -108,84 +362,120 @@ class SignalDatabase:
             )
         """
         )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_legs_signal ON signal_legs(signal_id)")
         self.conn.commit()
 
-    def signal_exists(self, asset, strategy, expiration):
+    def details_blob(self, signal_details):
         """
-        Verifica se já existe um sinal ativo para o mesmo ativo, estratégia e expiração.
+        Serializa os detalhes de um sinal para gravação, omitindo os campos que já possuem coluna própria.
 
-        :param asset: Ativo (ex: 'BTC').
-        :param strategy: Estratégia (ex: 'Short Strangle').
-        :param expiration: Data de expiração (ex: 'YYYY-MM-DD').
-        :return: True se o sinal já existir, False caso contrário.
+        :param signal_details: Dicionário com os detalhes do sinal.
+        :return: JSON em bytes (UTF-8).
         """
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT id FROM signals WHERE asset=? AND strategy=? AND expiration=? AND status='active'",
-            (asset, strategy, expiration),
-        )
-        row = cursor.fetchone()
-        return row is not None
+        return serialize_signal({k: v for k, v in signal_details.items() if k not in self.COLUMN_FIELDS})
+
+    def load_active_keys(self):
+        """
+        Carrega, com uma única consulta, as chaves (ativo, estratégia, expiração) de todos os sinais ativos.
+
+        :return: Conjunto de tuplas (asset, strategy, expiration).
+        """
+        cursor = self.conn.execute("SELECT asset, strategy, expiration FROM signals WHERE status='active'")
+        return set(cursor.fetchall())
 
-    def insert_signal(self, asset, strategy, expiration, premium, signal_details, roll_instruction):
+    def active_expirations(self, asset, strategy, expirations):
         """
-        Insere um novo sinal na tabela 'signals', se não for duplicado.
-        Retorna o ID do sinal inserido ou None se já existir.
+        Retorna, com uma única consulta, quais dos vencimentos informados já possuem sinal ativo
+        para o ativo e a estratégia.
 
         :param asset: Ativo (ex: 'BTC').
         :param strategy: Estratégia (ex: 'Short Strangle').
-        :param expiration: Data de expiração (ex: 'YYYY-MM-DD').
-        :param premium: Prêmio total da operação.
-        :param signal_details: Detalhes do sinal (dicionário convertido para JSON), incluindo 'leg_premiums' e 'max_profit'.
-        :param roll_instruction: Instrução de rolagem.
-        :return: ID do sinal inserido ou None.
+        :param expirations: Lista de datas de expiração (ex: 'YYYY-MM-DD').
+        :return: Conjunto com as expirações que já possuem sinal ativo.
         """
-        if self.signal_exists(asset, strategy, expiration):
-            return None
+        placeholders = ",".join("?" * len(expirations))
         cursor = self.conn.cursor()
         cursor.execute(
-            """
-            INSERT INTO signals (asset, strategy, expiration, premium, signal_details, roll_instruction)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (asset, strategy, expiration, premium, json.dumps(signal_details), roll_instruction),
+            f"SELECT expiration FROM signals WHERE asset=? AND strategy=? AND status='active' AND expiration IN ({placeholders})",
+            (asset, strategy, *expirations),
         )
-        self.conn.commit()
-        return cursor.lastrowid
+        return {row[0] for row in cursor.fetchall()}
 
-    def insert_signal_leg(self, signal_id, leg, premium, quantity):
+    def insert_signals_bulk(self, rows, known_keys=None):
         """
-        Insere os detalhes de uma perna da operação na tabela 'signal_legs'.
-
-        :param signal_id: ID do sinal associado.
-        :param leg: Nome da perna (ex: 'sell_call', 'sold_call', etc.).
-        :param premium: Valor do prêmio dessa perna.
-        :param quantity: Quantidade operada nessa perna.
+        Insere vários sinais de uma só vez, ignorando os duplicados (já ativos no banco ou repetidos
+        no próprio lote). Cada sinal é inserido com sua própria instrução (reaproveitada pelo cache de
+        instruções do sqlite3), e o ID de cada um é lido em `cursor.lastrowid`.
+        Não realiza commit: deve ser chamado dentro de `transaction()`.
+
+        :param rows: Lista de tuplas (asset, strategy, expiration, premium, signal_details, roll_instruction).
+        :param known_keys: Conjunto de chaves ativas obtido com `load_active_keys` (opcional). Serve de
+                           pré-filtro em memória e é atualizado; duplicados que escaparem dele são
+                           ignorados pelo INSERT OR IGNORE.
+        :return: Lista com o ID de cada sinal inserido, na mesma ordem de `rows` (None para os duplicados).
         """
+        ids = [None] * len(rows)
+        entry_epoch = int(time.time())
+        if known_keys is None:
+            known_keys = self.load_active_keys()
         cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO signal_legs (signal_id, leg, premium, quantity)
-            VALUES (?, ?, ?, ?)
-        """,
-            (signal_id, leg, premium, quantity),
-        )
-        self.conn.commit()
+        for i, (asset, strategy, expiration, premium, signal_details, roll_instruction) in enumerate(rows):
+            key = (asset, strategy, expiration)
+            if key in known_keys:
+                continue
+            known_keys.add(key)
+            # O conjunto de chaves é apenas um pré-filtro: se estiver desatualizado, o índice único parcial
+            # faz o INSERT ser ignorado (rowcount 0) em vez de falhar e desfazer todo o ciclo.
+            cursor.execute(
+                """
+                INSERT OR IGNORE INTO signals
+                    (asset, strategy, expiration, premium, signal_details, roll_instruction, exp_epoch, entry_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    asset,
+                    strategy,
+                    expiration,
+                    premium,
+                    self.details_blob(signal_details),
+                    roll_instruction,
+                    expiration_epoch(expiration),
+                    entry_epoch,
+                ),
+            )
+            ids[i] = cursor.lastrowid if cursor.rowcount else None
+        return ids
 
-    def insert_signal_legs(self, signal_id, signal, default_qty):
+    @staticmethod
+    def leg_rows(signal_id, signal, default_qty):
         """
-        Se o sinal contiver a chave 'leg_premiums', insere os valores reais dos prêmios e quantidades
-        de cada perna na tabela 'signal_legs'.
+        Monta as linhas da tabela 'signal_legs' de um sinal: uma por perna em 'leg_premiums', com o
+        prêmio real e a quantidade operada (ou a quantidade padrão, se não definida).
 
         :param signal_id: ID do sinal inserido.
         :param signal: Dicionário com os detalhes do sinal.
         :param default_qty: Quantidade padrão a ser utilizada se não definida.
+        :return: Lista de tuplas (signal_id, leg, premium, quantity); vazia se não houver 'leg_premiums'.
         """
-        if "leg_premiums" in signal:
-            for leg_key, premium_value in signal["leg_premiums"].items():
-                leg_details = signal.get(leg_key, {})
-                quantity = leg_details.get("quantity", default_qty)
-                self.insert_signal_leg(signal_id, leg_key, premium_value, quantity)
+        return [
+            (signal_id, leg_key, premium_value, signal.get(leg_key, {}).get("quantity", default_qty))
+            for leg_key, premium_value in signal.get("leg_premiums", {}).items()
+        ]
+
+    def insert_signal_legs_bulk(self, rows):
+        """
+        Insere as pernas de um ou mais sinais com um único `executemany`.
+        Não realiza commit: deve ser chamado dentro de `transaction()`.
+
+        :param rows: Iterável de tuplas (signal_id, leg, premium, quantity), como as montadas por `leg_rows`.
+        """
+        self.conn.executemany(
+            """
+            INSERT INTO signal_legs (signal_id, leg, premium, quantity)
+            VALUES (?, ?, ?, ?)
+        """,
+            rows,
+        )
 
     def check_roll_signals(self, roll_threshold_days=2, profit_threshold=0.75):
         """
@@ -198,38 +488,59 @@ class SignalDatabase:
         :param profit_threshold: Fração do tempo total decorrido para notificar rolagem.
         :return: Lista de mensagens de notificação.
         """
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        cursor = self.conn.cursor()
-        # Inclui signal_details na query para extrair informações sobre as posições abertas.
-        cursor.execute(
-            "SELECT id, asset, strategy, expiration, premium, roll_instruction, timestamp, signal_details FROM signals WHERE status = 'active'"
-        )
-        rows = cursor.fetchall()
+        now_ts = time.time()
+        # As datas já estão gravadas em segundos desde a época Unix (exp_epoch e entry_epoch, preenchidas
+        # na inserção): nenhuma conversão de data é feita por linha.
+        roll_threshold_seconds = roll_threshold_days * 86400
+        # Um único UPDATE ... RETURNING seleciona e marca como 'rolled' os sinais que geram notificação
+        # (próximos da expiração, com fração de tempo decorrido acima do limiar ou a 21 dias do vencimento),
+        # em uma única passada pelo índice e um único commit. Apenas essas linhas são transferidas para o
+        # Python, que só monta as mensagens. Inclui signal_details para extrair as posições abertas.
+        with self.transaction():
+            cursor = self.conn.cursor()
+            # Linhas como sqlite3.Row: as colunas são acessadas pelo nome.
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(
+                """
+                UPDATE signals SET status = 'rolled'
+                WHERE status = 'active'
+                  AND (exp_epoch - :now <= :roll_threshold
+                       OR (exp_epoch > entry_epoch AND :now - entry_epoch >= :profit_threshold * (exp_epoch - entry_epoch))
+                       OR (exp_epoch <= entry_epoch AND :profit_threshold <= 0)
+                       OR (exp_epoch - :now >= 21 * 86400 AND exp_epoch - :now < 22 * 86400))
+                RETURNING id, asset, strategy, expiration, roll_instruction,
+                          exp_epoch AS exp_ts, entry_epoch AS entry_ts, signal_details
+            """,
+                {
+                    "now": now_ts,
+                    "roll_threshold": roll_threshold_seconds,
+                    "profit_threshold": profit_threshold,
+                },
+            )
+            rows = cursor.fetchall()
+        # A ordem das linhas de RETURNING não é definida: as notificações seguem a ordem dos IDs.
+        rows.sort(key=lambda row: row["id"])
         notifications = []
         for row in rows:
-            (signal_id, asset, strategy, expiration, premium, roll_instruction, entry_timestamp, signal_details_str) = row
-            try:
-                exp_date_naive = datetime.strptime(expiration, "%Y-%m-%d")
-                exp_date = tz.localize(exp_date_naive)
-                entry_date_naive = datetime.strptime(entry_timestamp, "%Y-%m-%d %H:%M:%S")
-                entry_date = tz.localize(entry_date_naive)
-            except Exception as e:
-                continue
-
-            time_to_exp = exp_date - now
-            notify_exp = time_to_exp <= timedelta(days=roll_threshold_days)
-            total_time = exp_date - entry_date
-            elapsed = now - entry_date
-            profit_fraction = (elapsed.total_seconds() / total_time.total_seconds() if total_time.total_seconds() > 0 else 0)
+            signal_id = row["id"]
+            exp_ts = row["exp_ts"]
+            entry_ts = row["entry_ts"]
+            time_to_exp = exp_ts - now_ts
+            notify_exp = time_to_exp <= roll_threshold_seconds
+            total_time = exp_ts - entry_ts
+            elapsed = now_ts - entry_ts
+            profit_fraction = elapsed / total_time if total_time > 0 else 0
             notify_profit = profit_fraction >= profit_threshold
             # Nova condição: verificar se hoje é exatamente 21 dias antes do vencimento.
-            notify_21 = (exp_date - now).days == 21
+            notify_21 = time_to_exp // 86400 == 21
 
-            # Extrai os detalhes do sinal para identificar as posições abertas
+            asset, strategy, expiration = row["asset"], row["strategy"], row["expiration"]
+            # Extrai os detalhes do sinal para identificar as posições abertas (somente para os
+            # sinais que geram notificação).
             active_legs = []
             try:
-                signal_details = json.loads(signal_details_str)
+                # Aceita tanto o BLOB atual quanto o TEXT gravado por versões anteriores.
+                signal_details = orjson.loads(row["signal_details"])
                 # Verifica as chaves que indicam posições abertas e captura os símbolos
                 for leg_key in ["sell_call", "sell_put", "buy_call", "buy_put"]:
                     if leg_key in signal_details:
@@ -239,42 +550,38 @@ class SignalDatabase:
             except Exception as e:
                 pass
 
-            # Se qualquer uma das condições for atendida, gera a mensagem de rolagem.
-            if notify_exp or notify_profit or notify_21:
-                # Constrói a mensagem de rolagem detalhada.
-                if active_legs:
-                    new_roll_instruction = (
-                        f"Feche as posições de {', '.join(active_legs)} antes de abrir uma nova posição para a expiração {expiration}."
-                    )
-                else:
-                    new_roll_instruction = roll_instruction
-
-                # Se for o dia exato de 21 dias antes, adiciona essa informação na mensagem.
-                if notify_21:
-                    time_msg = "Hoje é exatamente 21 dias antes do vencimento. "
-                else:
-                    time_msg = ""
-                    
-                if notify_exp and notify_profit:
-                    message = (
-                        f"Signal ID {signal_id} ({asset} - {strategy}) está próximo da expiração ({expiration}) "
-                        f"e atingiu {profit_fraction*100:.1f}% do tempo decorrido. {time_msg}{new_roll_instruction}"
-                    )
-                elif notify_exp:
-                    message = (
-                        f"Signal ID {signal_id} ({asset} - {strategy}) está próximo da expiração ({expiration}). {time_msg}{new_roll_instruction}"
-                    )
-                elif notify_profit:
-                    message = (
-                        f"Signal ID {signal_id} ({asset} - {strategy}) atingiu {profit_fraction*100:.1f}% do tempo decorrido "
-                        f"(indicativo de lucro máximo). {time_msg}{new_roll_instruction}"
-                    )
-                else:
-                    message = new_roll_instruction
-
-                notifications.append(message)
-                cursor.execute("UPDATE signals SET status = 'rolled' WHERE id = ?", (signal_id,))
-        self.conn.commit()
+            # Constrói a mensagem de rolagem detalhada.
+            if active_legs:
+                new_roll_instruction = (
+                    f"Feche as posições de {', '.join(active_legs)} antes de abrir uma nova posição para a expiração {expiration}."
+                )
+            else:
+                new_roll_instruction = row["roll_instruction"]
+
+            # Se for o dia exato de 21 dias antes, adiciona essa informação na mensagem.
+            if notify_21:
+                time_msg = "Hoje é exatamente 21 dias antes do vencimento. "
+            else:
+                time_msg = ""
+                
+            if notify_exp and notify_profit:
+                message = (
+                    f"Signal ID {signal_id} ({asset} - {strategy}) está próximo da expiração ({expiration}) "
+                    f"e atingiu {profit_fraction*100:.1f}% do tempo decorrido. {time_msg}{new_roll_instruction}"
+                )
+            elif notify_exp:
+                message = (
+                    f"Signal ID {signal_id} ({asset} - {strategy}) está próximo da expiração ({expiration}). {time_msg}{new_roll_instruction}"
+                )
+            elif notify_profit:
+                message = (
+                    f"Signal ID {signal_id} ({asset} - {strategy}) atingiu {profit_fraction*100:.1f}% do tempo decorrido "
+                    f"(indicativo de lucro máximo). {time_msg}{new_roll_instruction}"
+                )
+            else:
+                message = new_roll_instruction
+
+            notifications.append(message)
         return notifications
 
 
@@ -291,7 +598,21 @@ class OptionStrategyBot:
         atingirem 65% de ROI.
     """
 
-    def __init__(self, api_key=None, secret=None, quote_currency="USDT", r=0.01):
+    # Ativos com margem simulada de $70 (os demais têm $130) quando a conta não está conectada.
+    MAJOR_ASSETS = frozenset({"BTC", "ETH"})
+
+    # Textos fixos dos sinais: definidos uma única vez e compartilhados por todos os vencimentos.
+    ROLL_SHORT_STRANGLE = "Fechar posições e montar novo Short Strangle para a próxima expiração."
+    ROLL_BULL_CALL_SPREAD = "Fechar a trava de alta e montar nova trava para a próxima expiração."
+    ROLL_BEAR_PUT_SPREAD = "Fechar a trava de baixa e montar nova trava para a próxima expiração."
+    ROLL_16D_SHORT_STRANGLE = "Rolagem: Iniciar rolagem 21 dias antes do vencimento."
+    RATIONALE_16D_SHORT_STRANGLE = (
+        "16 Delta Short Strangle: Venda de call e put com delta ~16, vencimento de 45 dias "
+        "(ou diversificação 5 dias antes/depois), rolagem 21 dias antes, "
+        "margem conforme VI e ROI de 65% para realização de lucros."
+    )
+
+    def __init__(self, api_key=None, secret=None, quote_currency="USDT", r=0.01, db=None):
         """
         Inicializa o robô.
 
@@ -299,48 +620,84 @@ class OptionStrategyBot:
         :param secret: Chave secreta da API (opcional).
         :param quote_currency: Moeda de cotação (padrão: "USDT").
         :param r: Taxa livre de risco anual (padrão: 0.01 ou 1%).
+        :param db: Instância de SignalDatabase (opcional). Se informada, os vencimentos que já possuem
+                   sinal ativo não são reprocessados.
         """
         self.quote_currency = quote_currency
+        self.tz = TZ
         self.r = r
+        self.db = db
         if api_key and secret:
             try:
-                self.exchange = ccxt.bybit({"apiKey": api_key, "secret": secret})
+                # enableRateLimit: o próprio ccxt espaça as requisições conforme o limite da exchange.
+                self.exchange = ccxt.bybit({"apiKey": api_key, "secret": secret, "enableRateLimit": True})
                 # Tentativa de conexão simples
                 self.exchange.fetch_ticker(f"BTC/{self.quote_currency}")
                 self.api_connected = True
             except Exception as e:
                 self.api_connected = False
-                print("WARNING: FAILED TO CONNECT TO ACCOUNT. ASSUMING CROSS MARGIN OF $70.00 USDT AND $130.00 IN VARIOUS CRYPTOS.")
+                logger.warning("FAILED TO CONNECT TO ACCOUNT. ASSUMING CROSS MARGIN OF $70.00 USDT AND $130.00 IN VARIOUS CRYPTOS.")
         else:
-            self.exchange = ccxt.bybit()  # Usa apenas endpoints públicos
+            self.exchange = ccxt.bybit({"enableRateLimit": True})  # Usa apenas endpoints públicos
             self.api_connected = False
-            print("WARNING: FAILED TO CONNECT TO ACCOUNT. ASSUMING CROSS MARGIN OF $70.00 USDT AND $130.00 IN VARIOUS CRYPTOS.")
+            logger.warning("FAILED TO CONNECT TO ACCOUNT. ASSUMING CROSS MARGIN OF $70.00 USDT AND $130.00 IN VARIOUS CRYPTOS.")
         self.assets = ["BTC", "ETH", "SOL"]
         self.iv_threshold = 0.50
         # Valores mínimos para os ativos:
         # BTC: 0.01, ETH: 0.01, SOL: 1.0
         self.asset_min_qty = {"BTC": 0.01, "ETH": 0.01, "SOL": 1.0}
+        # Cache de preços: todos os ativos são consultados com uma única chamada `fetch_tickers`,
+        # reaproveitada por `prices_ttl` segundos (medidos com relógio monotônico).
+        self.prices_ttl = 30
+        self._prices_cache = {}
+        self._prices_ts = None
+        # Serializa a atualização do cache quando vários ativos são analisados em paralelo.
+        self._prices_lock = threading.Lock()
+        # Chaves (ativo, estratégia, expiração) dos sinais ativos, carregadas uma vez por `run()`.
+        self._active_keys = None
+        # Cache das cadeias de opções em arrays NumPy, por (ativo, minuto, preço).
+        self._options_cache = {}
+        # Protege o cache de cadeias, acessado pelas threads de `run()`.
+        self._options_lock = threading.Lock()
+
+    def refresh_prices(self, assets=None):
+        """
+        Atualiza o cache de preços buscando os tickers de todos os ativos em uma única requisição.
+
+        :param assets: Ativos a consultar (padrão: todos os ativos configurados).
+        """
+        symbols = [f"{asset}/{self.quote_currency}" for asset in (assets or self.assets)]
+        tickers = self.exchange.fetch_tickers(symbols)
+        self._prices_cache = {symbol: ticker["last"] for symbol, ticker in tickers.items()}
+        self._prices_ts = time.monotonic()
 
     def fetch_underlying_price(self, asset):
         """
         Obtém o preço do ativo subjacente para o par asset/quote_currency.
+        O preço vem do cache preenchido por `refresh_prices`, atualizado quando expira o TTL.
 
         :param asset: Nome do ativo (ex: 'BTC').
         :return: Preço atual do ativo ou, em caso de falha de conexão, um preço simulado.
         """
         symbol = f"{asset}/{self.quote_currency}"
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return ticker["last"]
+            with self._prices_lock:
+                if (
+                    self._prices_ts is None
+                    or time.monotonic() - self._prices_ts > self.prices_ttl
+                    or symbol not in self._prices_cache
+                ):
+                    self.refresh_prices(set(self.assets) | {asset})
+                return self._prices_cache[symbol]
         except Exception as e:
-            print(f"Erro ao buscar ticker para {symbol}: {e}")
+            logger.warning("Erro ao buscar ticker para %s: %s", symbol, e)
             if not self.api_connected:
                 fallback_prices = {"BTC": 20000, "ETH": 1500, "SOL": 40}
-                print("WARNING: FAILED TO CONNECT TO ACCOUNT. ASSUMING DEFAULT UNDERLYING PRICE FOR SIMULATION.")
+                logger.warning("FAILED TO CONNECT TO ACCOUNT. ASSUMING DEFAULT UNDERLYING PRICE FOR SIMULATION.")
                 return fallback_prices.get(asset, 0)
             return None
 
-    def fetch_options_data(self, asset):
+    def fetch_options_data(self, asset, underlying_price=None):
         """
         Simula a obtenção de dados de opções para o ativo.
         (Essa função deve ser ajustada para usar dados reais, se disponíveis.)
@@ -348,23 +705,21 @@ class OptionStrategyBot:
         Gera automaticamente vencimentos semanais até 180 dias a partir de hoje.
 
         :param asset: Nome do ativo (ex: 'BTC').
+        :param underlying_price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
         :return: Dicionário contendo:
                   - 'expirations': lista de datas de vencimento no formato 'YYYY-MM-DD'.
                   - 'calls': lista de calls com strike, IV e símbolo.
                   - 'puts': lista de puts com strike, IV e símbolo.
         """
-        underlying_price = self.fetch_underlying_price(asset)
+        if underlying_price is None:
+            underlying_price = self.fetch_underlying_price(asset)
         if underlying_price is None:
             underlying_price = 0
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        expirations = []
-        start = now + timedelta(days=7)
-        end = now + timedelta(days=180)
-        current = start
-        while current <= end:
-            expirations.append(current.strftime("%Y-%m-%d"))
-            current += timedelta(days=7)
+        today = np.datetime64(datetime.now(self.tz).date(), "D")
+        # Vencimentos semanais de hoje + 7 dias até hoje + 180 dias, gerados de uma só vez.
+        expirations = np.arange(
+            today + np.timedelta64(7, "D"), today + np.timedelta64(181, "D"), np.timedelta64(7, "D")
+        ).astype(str).tolist()
         return {
             "expirations": expirations,
             "calls": [
@@ -393,25 +748,200 @@ class OptionStrategyBot:
             ],
         }
 
-    def time_to_expiration(self, expiration):
+    def time_to_expiration(self, expiration, now_epoch_minute=None):
         """
         Calcula o tempo até a expiração em anos.
 
         :param expiration: Data de expiração no formato 'YYYY-MM-DD'.
+        :param now_epoch_minute: Minuto atual (epoch // 60); se omitido, usa o relógio do sistema.
         :return: Tempo até expiração (T) em anos.
         """
+        if now_epoch_minute is None:
+            now_epoch_minute = int(time.time()) // 60
         try:
-            tz = pytz.timezone("America/Recife")
-            exp_date_naive = datetime.strptime(expiration, "%Y-%m-%d")
-            exp_date = tz.localize(exp_date_naive)
-            now = datetime.now(tz)
-            T_seconds = (exp_date - now).total_seconds()
-            T_years = T_seconds / (365 * 24 * 3600)
-            return max(T_years, 0)  # Garante que T não seja negativo
+            return time_to_expiration_years(expiration, now_epoch_minute)
         except Exception as e:
-            print(f"Erro ao calcular T para expiração {expiration}: {e}")
+            logger.warning("Erro ao calcular T para expiração %s: %s", expiration, e)
             return 0
 
+    def filter_expirations(self, expirations, max_days=180):
+        """
+        Seleciona os vencimentos entre hoje e `max_days` dias, calculando o tempo até a expiração
+        de cada um em uma única passada (cada data é convertida apenas uma vez).
+
+        :param expirations: Lista de datas de vencimento no formato 'YYYY-MM-DD'.
+        :param max_days: Número máximo de dias até o vencimento.
+        :return: Tupla (vencimentos válidos, lista de T em anos para cada vencimento).
+        """
+        now = datetime.now(self.tz)
+        now_epoch_minute = int(now.timestamp()) // 60
+        valid_exps = []
+        T_years = []
+        for expiration in expirations:
+            if 0 <= (parse_expiration(expiration) - now).days <= max_days:
+                valid_exps.append(expiration)
+                T_years.append(self.time_to_expiration(expiration, now_epoch_minute))
+        return valid_exps, T_years
+
+    def _existing_expirations(self, asset, strategy, expirations):
+        """
+        Retorna quais vencimentos já possuem sinal ativo, consultando o conjunto de chaves carregado
+        no início de `run()` ou, fora de um ciclo, o banco de dados.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param strategy: Estratégia (ex: 'Short Strangle').
+        :param expirations: Lista de vencimentos no formato 'YYYY-MM-DD'.
+        :return: Conjunto com os vencimentos que já possuem sinal ativo.
+        """
+        if self._active_keys is not None:
+            return {exp for exp in expirations if (asset, strategy, exp) in self._active_keys}
+        return self.db.active_expirations(asset, strategy, expirations)
+
+    def skip_active_expirations(self, asset, strategy, expirations, T_years):
+        """
+        Remove os vencimentos que já possuem um sinal ativo para o ativo e a estratégia, evitando
+        precificar sinais que seriam descartados como duplicados na inserção.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param strategy: Estratégia (ex: 'Short Strangle').
+        :param expirations: Lista de vencimentos no formato 'YYYY-MM-DD'.
+        :param T_years: Array NumPy com o tempo até a expiração de cada vencimento.
+        :return: Tupla (vencimentos restantes, array de T correspondente).
+        """
+        if self.db is None or not expirations:
+            return expirations, T_years
+        existing = self._existing_expirations(asset, strategy, expirations)
+        if not existing:
+            return expirations, T_years
+        keep = [i for i, expiration in enumerate(expirations) if expiration not in existing]
+        return [expirations[i] for i in keep], T_years[keep]
+
+    def _build_expiration_table(self, asset, price=None, options_data=None):
+        """
+        Monta, uma única vez por ativo, a tabela de vencimentos compartilhada pelas estratégias,
+        em formato de estrutura de arrays (SoA): os vencimentos válidos e um array NumPy com o tempo
+        até a expiração de cada um, além das cadeias de calls (strike crescente) e puts (strike
+        decrescente) já ordenadas.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
+        :param options_data: Dados de opções já obtidos no ciclo; se omitidos, são buscados.
+        :return: Dicionário com 'price', 'expirations', 'T', 'calls' e 'puts', ou None se o preço
+                 do ativo não estiver disponível.
+        """
+        if price is None:
+            price = self.fetch_underlying_price(asset)
+        if price is None:
+            return None
+        return {"price": price, **self._options_soa(asset, int(time.time()) // 60, price, options_data)}
+
+    def _options_soa(self, asset, minute_bucket, price=None, options_data=None):
+        """
+        Converte os dados de opções do ativo em arrays NumPy (strikes e IVs por cadeia, T por
+        vencimento). Quando os dados de opções não são informados, a cadeia buscada é mantida em cache
+        durante o minuto corrente, por (ativo, minuto, preço); dados informados pelo chamador são
+        sempre convertidos, sem consultar nem alterar o cache.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param minute_bucket: Minuto atual (epoch // 60), usado como chave do cache.
+        :param price: Preço do ativo, repassado a `fetch_options_data`.
+        :param options_data: Dados de opções já obtidos; se omitidos, são buscados.
+        :return: Dicionário com 'expirations', 'T', 'calls', 'puts', 'call_strikes', 'call_ivs',
+                 'put_strikes' e 'put_ivs'.
+        """
+        if options_data is not None:
+            return self._to_soa(options_data)
+        key = (asset, minute_bucket, price)
+        with self._options_lock:
+            cached = self._options_cache.get(key)
+        if cached is not None:
+            return cached
+        soa = self._to_soa(self.fetch_options_data(asset, price))
+        with self._options_lock:
+            # Entradas de minutos anteriores são descartadas.
+            self._options_cache = {k: v for k, v in self._options_cache.items() if k[1] == minute_bucket}
+            self._options_cache[key] = soa
+        return soa
+
+    def _to_soa(self, options_data):
+        """
+        Converte os dados de opções em arrays NumPy, com as calls em ordem crescente de strike e as
+        puts em ordem decrescente.
+
+        :param options_data: Dados de opções no formato de `fetch_options_data`.
+        :return: Dicionário com 'expirations', 'T', 'calls', 'puts', 'call_strikes', 'call_ivs',
+                 'put_strikes' e 'put_ivs'.
+        """
+        valid_exps, T_years = self.filter_expirations(options_data.get("expirations", []))
+        calls = sorted(options_data["calls"], key=lambda x: x["strike"])
+        puts = sorted(options_data["puts"], key=lambda x: x["strike"], reverse=True)
+        return {
+            "expirations": valid_exps,
+            "T": np.array(T_years, dtype=float),
+            "calls": calls,
+            "puts": puts,
+            "call_strikes": np.array([op["strike"] for op in calls], dtype=float),
+            "call_ivs": np.array([op["iv"] for op in calls], dtype=float),
+            "put_strikes": np.array([op["strike"] for op in puts], dtype=float),
+            "put_ivs": np.array([op["iv"] for op in puts], dtype=float),
+        }
+
+    def _check_margin(self, asset, margin, price):
+        """
+        Verifica se a margem exigida pela operação é aceitável. Com a conta conectada, a margem de
+        manutenção (MM) não pode exceder 55% do preço; sem conexão, a margem exigida não pode exceder
+        a margem simulada disponível ($70 para BTC/ETH e $130 para os demais ativos).
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param margin: Margem exigida pela operação.
+        :param price: Preço atual do ativo.
+        :return: Tupla (operação permitida, motivo da recusa ou string vazia).
+        """
+        if self.api_connected:
+            margin_percent = (margin / price) * 100
+            if margin_percent > 55:
+                return False, f"NOT POSSIBLE: REQUIRED MM {margin_percent:.1f}% exceeds 55%."
+            return True, ""
+        available_margin = 70 if asset in self.MAJOR_ASSETS else 130
+        if margin > available_margin:
+            return False, f"NOT POSSIBLE: REQUIRED MARGIN ${margin:.2f}, AVAILABLE ${available_margin:.2f}."
+        return True, ""
+
+    def _build_signal(self, asset, strategy, expiration, premium, leg_premiums, legs, rationale, ok, reason):
+        """
+        Monta o dicionário do sinal: o sinal da estratégia com as suas pernas, ou o sinal
+        "No Trade" quando a margem não permite a operação.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param strategy: Estratégia (ex: 'Bear Put Spread').
+        :param expiration: Data de expiração no formato 'YYYY-MM-DD'.
+        :param premium: Prêmio total (ou crédito líquido) do sinal.
+        :param leg_premiums: Prêmios de cada perna.
+        :param legs: Dicionário com as pernas do sinal (ex: {'sell_put': {...}, 'buy_put': {...}}).
+        :param rationale: Justificativa do sinal válido.
+        :param ok: Resultado de `_check_margin`.
+        :param reason: Motivo da recusa retornado por `_check_margin`.
+        :return: Dicionário do sinal.
+        """
+        if not ok:
+            return {
+                "asset": asset,
+                "strategy": f"No Trade - {strategy}",
+                "expiration": expiration,
+                "premium": premium,
+                "leg_premiums": leg_premiums,
+                "rationale": reason,
+            }
+        return {
+            "asset": asset,
+            "strategy": strategy,
+            **legs,
+            "expiration": expiration,
+            "premium": premium,
+            "leg_premiums": leg_premiums,
+            "rationale": rationale,
+        }
+
     def calculate_max_profit(self, strategy, signal, T):
         """
         Calcula o máximo potencial de lucro na abertura do sinal.
@@ -450,33 +980,77 @@ class OptionStrategyBot:
             # Estratégias com prazo fixo (ex.: 16 Delta Short Strangle) não usam essa técnica.
             return None
 
-    def analyze_and_generate_short_strangle(self, asset):
+    def analyze_all_strategies(self, asset, price=None, options_data=None):
+        """
+        Gera, em uma única passada, os sinais de Short Strangle, Bull Call Spread e Bear Put Spread.
+        O preço do ativo, os dados de opções e a tabela de vencimentos são obtidos uma única vez e
+        compartilhados pelas três estratégias.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
+        :param options_data: Dados de opções já obtidos no ciclo; se omitidos, são buscados.
+        :return: Dicionário com as listas de tuplas (sinal, roll_instruction) de cada estratégia.
+        """
+        table = self._build_expiration_table(asset, price, options_data)
+        if table is None:
+            return {"short_strangle": [], "bull_call_spread": [], "bear_put_spread": []}
+        return {
+            "short_strangle": self._generate_short_strangle(asset, table),
+            "bull_call_spread": self._generate_bull_call_spread(asset, table),
+            "bear_put_spread": self._generate_bear_put_spread(asset, table),
+        }
+
+    def analyze_and_generate_short_strangle(self, asset, price=None, options_data=None):
         """
         Analisa o ativo para gerar sinais de Short Strangle para todos os vencimentos
         disponíveis até 6 meses.
 
         :param asset: Nome do ativo (ex: 'BTC').
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
+        :param options_data: Dados de opções já obtidos no ciclo; se omitidos, são buscados.
         :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
         """
-        price = self.fetch_underlying_price(asset)
-        if price is None:
+        table = self._build_expiration_table(asset, price, options_data)
+        if table is None:
             return []
-        options_data = self.fetch_options_data(asset)
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        valid_exps = [exp for exp in options_data.get("expirations", [])
-                      if 0 <= (tz.localize(datetime.strptime(exp, "%Y-%m-%d")) - now).days <= 180]
-        signals_list = []
-        for expiration in valid_exps:
-            T = self.time_to_expiration(expiration)
-            otm_calls = [op for op in options_data["calls"] if op["strike"] > price]
-            otm_puts = [op for op in options_data["puts"] if op["strike"] < price]
-            default_qty = self.asset_min_qty.get(asset, 0.01)
-            if otm_calls and otm_puts:
-                call_to_sell = min(otm_calls, key=lambda x: x["strike"])
-                put_to_sell = max(otm_puts, key=lambda x: x["strike"])
-                premium_call = black_scholes_price(price, call_to_sell["strike"], T, self.r, call_to_sell["iv"], "call")
-                premium_put = black_scholes_price(price, put_to_sell["strike"], T, self.r, put_to_sell["iv"], "put")
+        return self._generate_short_strangle(asset, table)
+
+    def _generate_short_strangle(self, asset, table):
+        """
+        Gera os sinais de Short Strangle a partir da tabela de vencimentos já montada.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param table: Tabela de vencimentos retornada por `_build_expiration_table`.
+        :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
+        """
+        price = table["price"]
+        # Vencimentos que já possuem sinal ativo são descartados antes da precificação.
+        valid_exps, T_years = self.skip_active_expirations(asset, "Short Strangle", table["expirations"], table["T"])
+        call_strikes = table["call_strikes"]
+        put_strikes = table["put_strikes"]
+        # Busca binária nos strikes já ordenados (calls em ordem crescente, puts em ordem decrescente):
+        # posição da call OTM de menor strike e da put OTM de maior strike (as mais próximas do preço).
+        call_index = int(np.searchsorted(call_strikes, price, side="right"))
+        put_index = int(np.searchsorted(-put_strikes, -price, side="right"))
+        has_otm = call_index < len(call_strikes) and put_index < len(put_strikes)
+        default_qty = self.asset_min_qty.get(asset, 0.01)
+        if has_otm:
+            call_to_sell = table["calls"][call_index]
+            put_to_sell = table["puts"][put_index]
+            # Precifica as duas pernas para todos os vencimentos em uma única chamada vetorizada.
+            premiums = black_scholes_price_vec(
+                price,
+                [call_to_sell["strike"], put_to_sell["strike"]],
+                T_years[:, np.newaxis],
+                self.r,
+                [call_to_sell["iv"], put_to_sell["iv"]],
+                [True, False],
+            ).tolist()
+        signals_list = [None] * len(valid_exps)
+        for i, expiration in enumerate(valid_exps):
+            T = T_years[i]
+            if has_otm:
+                premium_call, premium_put = premiums[i]
                 total_premium = premium_call + premium_put
                 leg_premiums = {"sell_call": premium_call, "sell_put": premium_put}
                 sell_call_qty = default_qty
@@ -493,58 +1067,22 @@ class OptionStrategyBot:
                 risk = max(risk_call, risk_put)
                 margin = risk - total_premium
 
-                if self.api_connected:
-                    margin_percent = (margin / price) * 100
-                    if margin_percent > 55:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Short Strangle",
-                            "expiration": expiration,
-                            "premium": total_premium,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MM {margin_percent:.1f}% exceeds 55%."
-                        }
-                        roll_instruction = ""
-                    else:
-                        roll_instruction = "Fechar posições e montar novo Short Strangle para a próxima expiração."
-                        call_to_sell.update({"quantity": sell_call_qty})
-                        put_to_sell.update({"quantity": sell_put_qty})
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Short Strangle",
-                            "sell_call": call_to_sell,
-                            "sell_put": put_to_sell,
-                            "expiration": expiration,
-                            "premium": total_premium,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"IV média acima do limiar. Preços: call={premium_call:.4f}, put={premium_put:.4f}."
-                        }
-                else:
-                    available_margin = 70 if asset in ["BTC", "ETH"] else 130
-                    if margin > available_margin:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Short Strangle",
-                            "expiration": expiration,
-                            "premium": total_premium,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MARGIN ${margin:.2f}, AVAILABLE ${available_margin:.2f}."
-                        }
-                        roll_instruction = ""
-                    else:
-                        roll_instruction = "Fechar posições e montar novo Short Strangle para a próxima expiração."
-                        call_to_sell.update({"quantity": sell_call_qty})
-                        put_to_sell.update({"quantity": sell_put_qty})
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Short Strangle",
-                            "sell_call": call_to_sell,
-                            "sell_put": put_to_sell,
-                            "expiration": expiration,
-                            "premium": total_premium,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"IV média acima do limiar. Preços: call={premium_call:.4f}, put={premium_put:.4f}."
-                        }
+                ok, reason = self._check_margin(asset, margin, price)
+                roll_instruction = self.ROLL_SHORT_STRANGLE if ok else ""
+                signal = self._build_signal(
+                    asset,
+                    "Short Strangle",
+                    expiration,
+                    total_premium,
+                    leg_premiums,
+                    {
+                        "sell_call": {**call_to_sell, "quantity": sell_call_qty},
+                        "sell_put": {**put_to_sell, "quantity": sell_put_qty},
+                    },
+                    f"IV média acima do limiar. Preços: call={premium_call:.4f}, put={premium_put:.4f}.",
+                    ok,
+                    reason,
+                )
             else:
                 roll_instruction = ""
                 signal = {
@@ -558,32 +1096,60 @@ class OptionStrategyBot:
             # Calcula o máximo potencial de lucro para esta estratégia
             max_profit = self.calculate_max_profit("Short Strangle", signal, T)
             signal["max_profit"] = max_profit
-            signals_list.append((signal, roll_instruction))
+            signals_list[i] = (signal, roll_instruction)
         return signals_list
 
-    def analyze_and_generate_bull_call_spread(self, asset):
+    def analyze_and_generate_bull_call_spread(self, asset, price=None, options_data=None):
         """
         Analisa o ativo para gerar sinais de Bull Call Spread para todos os vencimentos
         disponíveis até 6 meses.
 
         :param asset: Nome do ativo (ex: 'BTC').
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
+        :param options_data: Dados de opções já obtidos no ciclo; se omitidos, são buscados.
         :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
         """
-        price = self.fetch_underlying_price(asset)
-        if price is None:
+        table = self._build_expiration_table(asset, price, options_data)
+        if table is None:
             return []
-        options_data = self.fetch_options_data(asset)
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        valid_exps = [exp for exp in options_data.get("expirations", [])
-                      if 0 <= (tz.localize(datetime.strptime(exp, "%Y-%m-%d")) - now).days <= 180]
-        signals_list = []
-        for expiration in valid_exps:
-            T = self.time_to_expiration(expiration)
-            calls = options_data["calls"]
+        return self._generate_bull_call_spread(asset, table)
+
+    def _generate_bull_call_spread(self, asset, table):
+        """
+        Gera os sinais de Bull Call Spread a partir da tabela de vencimentos já montada.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param table: Tabela de vencimentos retornada por `_build_expiration_table`.
+        :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
+        """
+        price = table["price"]
+        # Vencimentos que já possuem sinal ativo são descartados antes da precificação.
+        valid_exps, T_years = self.skip_active_expirations(asset, "Bull Call Spread", table["expirations"], table["T"])
+        calls = table["calls"]
+        sold_call = bought_call = None
+        if len(calls) >= 2:
+            # A call OTM de menor strike é vendida e a seguinte (strike maior) comprada.
+            # Busca binária: os strikes das calls estão em ordem crescente.
+            index = int(np.searchsorted(table["call_strikes"], price, side="right"))
+            if index < len(calls):
+                sold_call = calls[index]
+                if index + 1 < len(calls):
+                    bought_call = calls[index + 1]
+        if bought_call is not None:
+            # Precifica as duas pernas para todos os vencimentos em uma única chamada vetorizada.
+            legs = slice(index, index + 2)
+            premiums = black_scholes_price_vec(
+                price,
+                table["call_strikes"][legs],
+                T_years[:, np.newaxis],
+                self.r,
+                table["call_ivs"][legs],
+                True,
+            ).tolist()
+        signals_list = [None] * len(valid_exps)
+        for i, expiration in enumerate(valid_exps):
+            T = T_years[i]
             if len(calls) >= 2:
-                sorted_calls = sorted(calls, key=lambda x: x["strike"])
-                sold_call = next((op for op in sorted_calls if op["strike"] > price), None)
                 if sold_call is None:
                     signal = {
                         "asset": asset,
@@ -592,12 +1158,9 @@ class OptionStrategyBot:
                         "expiration": expiration,
                         "premium": 0,
                     }
-                    signals_list.append((signal, ""))
+                    signals_list[i] = (signal, "")
                     continue
-                index = sorted_calls.index(sold_call)
-                if index + 1 < len(sorted_calls):
-                    bought_call = sorted_calls[index + 1]
-                else:
+                if bought_call is None:
                     signal = {
                         "asset": asset,
                         "strategy": "No Trade - Bull Call Spread",
@@ -605,11 +1168,10 @@ class OptionStrategyBot:
                         "expiration": expiration,
                         "premium": 0,
                     }
-                    signals_list.append((signal, ""))
+                    signals_list[i] = (signal, "")
                     continue
 
-                sold_call_premium = black_scholes_price(price, sold_call["strike"], T, self.r, sold_call["iv"], "call")
-                bought_call_cost = black_scholes_price(price, bought_call["strike"], T, self.r, bought_call["iv"], "call")
+                sold_call_premium, bought_call_cost = premiums[i]
                 net_credit = sold_call_premium - bought_call_cost
                 leg_premiums = {"sold_call": sold_call_premium, "bought_call": bought_call_cost}
                 qty = self.asset_min_qty.get(asset, 0.01)
@@ -620,58 +1182,19 @@ class OptionStrategyBot:
                 spread_width = bought_call["strike"] - sold_call["strike"]
                 margin = spread_width - net_credit
 
-                if self.api_connected:
-                    margin_percent = (margin / price) * 100
-                    if margin_percent > 55:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Bull Call Spread",
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MM {margin_percent:.1f}% exceeds 55%."
-                        }
-                        roll_instruction = ""
-                    else:
-                        sold_call.update({"quantity": qty})
-                        bought_call.update({"quantity": qty})
-                        roll_instruction = "Fechar a trava de alta e montar nova trava para a próxima expiração."
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Bull Call Spread",
-                            "sell_call": sold_call,
-                            "buy_call": bought_call,
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"Crédito líquido: {net_credit:.4f}."
-                        }
-                else:
-                    available_margin = 70 if asset in ["BTC", "ETH"] else 130
-                    if margin > available_margin:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Bull Call Spread",
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MARGIN ${margin:.2f}, AVAILABLE ${available_margin:.2f}."
-                        }
-                        roll_instruction = ""
-                    else:
-                        sold_call.update({"quantity": qty})
-                        bought_call.update({"quantity": qty})
-                        roll_instruction = "Fechar a trava de alta e montar nova trava para a próxima expiração."
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Bull Call Spread",
-                            "sell_call": sold_call,
-                            "buy_call": bought_call,
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"Crédito líquido: {net_credit:.4f}."
-                        }
+                ok, reason = self._check_margin(asset, margin, price)
+                roll_instruction = self.ROLL_BULL_CALL_SPREAD if ok else ""
+                signal = self._build_signal(
+                    asset,
+                    "Bull Call Spread",
+                    expiration,
+                    net_credit,
+                    leg_premiums,
+                    {"sell_call": {**sold_call, "quantity": qty}, "buy_call": {**bought_call, "quantity": qty}},
+                    f"Crédito líquido: {net_credit:.4f}.",
+                    ok,
+                    reason,
+                )
                 # Calcula o máximo potencial de lucro para Bull Call Spread
                 max_profit = self.calculate_max_profit("Bull Call Spread", signal, T)
                 signal["max_profit"] = max_profit
@@ -685,32 +1208,60 @@ class OptionStrategyBot:
                     "leg_premiums": {},
                     "rationale": "Dados insuficientes de opções."
                 }
-            signals_list.append((signal, roll_instruction))
+            signals_list[i] = (signal, roll_instruction)
         return signals_list
 
-    def analyze_and_generate_bear_put_spread(self, asset):
+    def analyze_and_generate_bear_put_spread(self, asset, price=None, options_data=None):
         """
         Analisa o ativo para gerar sinais de Bear Put Spread para todos os vencimentos
         disponíveis até 6 meses.
 
         :param asset: Nome do ativo (ex: 'BTC').
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
+        :param options_data: Dados de opções já obtidos no ciclo; se omitidos, são buscados.
         :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
         """
-        price = self.fetch_underlying_price(asset)
-        if price is None:
+        table = self._build_expiration_table(asset, price, options_data)
+        if table is None:
             return []
-        options_data = self.fetch_options_data(asset)
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        valid_exps = [exp for exp in options_data.get("expirations", [])
-                      if 0 <= (tz.localize(datetime.strptime(exp, "%Y-%m-%d")) - now).days <= 180]
-        signals_list = []
-        for expiration in valid_exps:
-            T = self.time_to_expiration(expiration)
-            puts = options_data["puts"]
+        return self._generate_bear_put_spread(asset, table)
+
+    def _generate_bear_put_spread(self, asset, table):
+        """
+        Gera os sinais de Bear Put Spread a partir da tabela de vencimentos já montada.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param table: Tabela de vencimentos retornada por `_build_expiration_table`.
+        :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento válido.
+        """
+        price = table["price"]
+        # Vencimentos que já possuem sinal ativo são descartados antes da precificação.
+        valid_exps, T_years = self.skip_active_expirations(asset, "Bear Put Spread", table["expirations"], table["T"])
+        puts = table["puts"]
+        sold_put = bought_put = None
+        if len(puts) >= 2:
+            # A put OTM de maior strike é vendida e a seguinte (strike menor) comprada.
+            # Busca binária: os strikes das puts estão em ordem decrescente (daí a negação).
+            index = int(np.searchsorted(-table["put_strikes"], -price, side="right"))
+            if index < len(puts):
+                sold_put = puts[index]
+                if index + 1 < len(puts):
+                    bought_put = puts[index + 1]
+        if bought_put is not None:
+            # Precifica as duas pernas para todos os vencimentos em uma única chamada vetorizada.
+            legs = slice(index, index + 2)
+            premiums = black_scholes_price_vec(
+                price,
+                table["put_strikes"][legs],
+                T_years[:, np.newaxis],
+                self.r,
+                table["put_ivs"][legs],
+                False,
+            ).tolist()
+        signals_list = [None] * len(valid_exps)
+        for i, expiration in enumerate(valid_exps):
+            T = T_years[i]
             if len(puts) >= 2:
-                sorted_puts = sorted(puts, key=lambda x: x["strike"], reverse=True)
-                sold_put = next((op for op in sorted_puts if op["strike"] < price), None)
                 if sold_put is None:
                     signal = {
                         "asset": asset,
@@ -719,12 +1270,9 @@ class OptionStrategyBot:
                         "expiration": expiration,
                         "premium": 0,
                     }
-                    signals_list.append((signal, ""))
+                    signals_list[i] = (signal, "")
                     continue
-                index = sorted_puts.index(sold_put)
-                if index + 1 < len(sorted_puts):
-                    bought_put = sorted_puts[index + 1]
-                else:
+                if bought_put is None:
                     signal = {
                         "asset": asset,
                         "strategy": "No Trade - Bear Put Spread",
@@ -732,11 +1280,10 @@ class OptionStrategyBot:
                         "expiration": expiration,
                         "premium": 0,
                     }
-                    signals_list.append((signal, ""))
+                    signals_list[i] = (signal, "")
                     continue
 
-                sold_put_premium = black_scholes_price(price, sold_put["strike"], T, self.r, sold_put["iv"], "put")
-                bought_put_cost = black_scholes_price(price, bought_put["strike"], T, self.r, bought_put["iv"], "put")
+                sold_put_premium, bought_put_cost = premiums[i]
                 net_credit = sold_put_premium - bought_put_cost
                 leg_premiums = {"sold_put": sold_put_premium, "bought_put": bought_put_cost}
                 qty = self.asset_min_qty.get(asset, 0.01)
@@ -747,58 +1294,19 @@ class OptionStrategyBot:
                 spread_width = sold_put["strike"] - bought_put["strike"]
                 margin = spread_width - net_credit
 
-                if self.api_connected:
-                    margin_percent = (margin / price) * 100
-                    if margin_percent > 55:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Bear Put Spread",
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MM {margin_percent:.1f}% exceeds 55%."
-                        }
-                        roll_instruction = ""
-                    else:
-                        sold_put.update({"quantity": qty})
-                        bought_put.update({"quantity": qty})
-                        roll_instruction = "Fechar a trava de baixa e montar nova trava para a próxima expiração."
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Bear Put Spread",
-                            "sell_put": sold_put,
-                            "buy_put": bought_put,
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"Crédito líquido: {net_credit:.4f}."
-                        }
-                else:
-                    available_margin = 70 if asset in ["BTC", "ETH"] else 130
-                    if margin > available_margin:
-                        signal = {
-                            "asset": asset,
-                            "strategy": "No Trade - Bear Put Spread",
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"NOT POSSIBLE: REQUIRED MARGIN ${margin:.2f}, AVAILABLE ${available_margin:.2f}."
-                        }
-                        roll_instruction = ""
-                    else:
-                        sold_put.update({"quantity": qty})
-                        bought_put.update({"quantity": qty})
-                        roll_instruction = "Fechar a trava de baixa e montar nova trava para a próxima expiração."
-                        signal = {
-                            "asset": asset,
-                            "strategy": "Bear Put Spread",
-                            "sell_put": sold_put,
-                            "buy_put": bought_put,
-                            "expiration": expiration,
-                            "premium": net_credit,
-                            "leg_premiums": leg_premiums,
-                            "rationale": f"Crédito líquido: {net_credit:.4f}."
-                        }
+                ok, reason = self._check_margin(asset, margin, price)
+                roll_instruction = self.ROLL_BEAR_PUT_SPREAD if ok else ""
+                signal = self._build_signal(
+                    asset,
+                    "Bear Put Spread",
+                    expiration,
+                    net_credit,
+                    leg_premiums,
+                    {"sell_put": {**sold_put, "quantity": qty}, "buy_put": {**bought_put, "quantity": qty}},
+                    f"Crédito líquido: {net_credit:.4f}.",
+                    ok,
+                    reason,
+                )
                 # Calcula o máximo potencial de lucro para Bear Put Spread
                 max_profit = self.calculate_max_profit("Bear Put Spread", signal, T)
                 signal["max_profit"] = max_profit
@@ -812,10 +1320,26 @@ class OptionStrategyBot:
                     "leg_premiums": {},
                     "rationale": "Dados insuficientes de opções."
                 }
-            signals_list.append((signal, roll_instruction))
+            signals_list[i] = (signal, roll_instruction)
         return signals_list
 
-    def analyze_and_generate_16delta_short_strangle(self, asset):
+    def fixed_expirations(self, days=(45, 40, 50)):
+        """
+        Calcula os vencimentos fixos da estratégia 16 Delta Short Strangle (45 dias, com diversificação
+        de 5 dias antes e depois) e o tempo até a expiração de cada um.
+
+        :param days: Prazos, em dias a partir de hoje.
+        :return: Lista de tuplas (vencimento no formato 'YYYY-MM-DD', T em anos).
+        """
+        now = datetime.now(self.tz)
+        now_epoch_minute = int(now.timestamp()) // 60
+        fixed = []
+        for d in days:
+            expiration = (now + timedelta(days=d)).date().isoformat()
+            fixed.append((expiration, self.time_to_expiration(expiration, now_epoch_minute)))
+        return fixed
+
+    def analyze_and_generate_16delta_short_strangle(self, asset, fixed_expirations=None, price=None):
         """
         Analisa o ativo para gerar sinais da estratégia 16 Delta Short Strangle para vencimentos fixos.
         
@@ -828,18 +1352,15 @@ class OptionStrategyBot:
           - Realização de lucros: Renda perpétua com rolagem ou encerramento quando as opções atingirem 65% de ROI.
         
         :param asset: Nome do ativo (ex: 'BTC').
+        :param fixed_expirations: Lista de tuplas (vencimento, T) calculada por `fixed_expirations`;
+                                  se omitida, é calculada na chamada.
+        :param price: Preço do ativo já obtido no ciclo; se omitido, é buscado.
         :return: Lista de tuplas (sinal, roll_instruction) para cada vencimento definido.
         """
-        tz = pytz.timezone("America/Recife")
-        now = datetime.now(tz)
-        signals_list = []
-        # Definindo vencimentos fixos: 45 dias, 40 dias e 50 dias a partir de hoje.
-        expirations = [
-            (now + timedelta(days=45)).strftime("%Y-%m-%d"),
-            (now + timedelta(days=40)).strftime("%Y-%m-%d"),
-            (now + timedelta(days=50)).strftime("%Y-%m-%d"),
-        ]
-        price = self.fetch_underlying_price(asset)
+        if fixed_expirations is None:
+            fixed_expirations = self.fixed_expirations()
+        if price is None:
+            price = self.fetch_underlying_price(asset)
         if price is None:
             return []
         # Simula strikes para delta ~16: para calls, strike = 1.15 * preço; para puts, strike = 0.85 * preço.
@@ -848,12 +1369,24 @@ class OptionStrategyBot:
         # Simula volatilidade implícita específica para essa estratégia.
         call_iv = 0.50
         put_iv = 0.50
+        call_symbol = f"{asset}_CALL_16D"
+        put_symbol = f"{asset}_PUT_16D"
+        # Vencimentos que já possuem sinal ativo não são reprocessados.
+        if self.db is not None:
+            existing = self._existing_expirations(
+                asset, "16 Delta Short Strangle", [exp for exp, _ in fixed_expirations]
+            )
+            fixed_expirations = [(exp, T) for exp, T in fixed_expirations if exp not in existing]
+        expirations = [exp for exp, _ in fixed_expirations]
+        T_years = np.array([T for _, T in fixed_expirations], dtype=float)
         # Define a quantidade padrão para a estratégia.
         default_qty = self.asset_min_qty.get(asset, 0.01)
-        for exp in expirations:
-            T = self.time_to_expiration(exp)
-            premium_call = black_scholes_price(price, call_strike, T, self.r, call_iv, "call")
-            premium_put = black_scholes_price(price, put_strike, T, self.r, put_iv, "put")
+        # Precifica as duas pernas de todos os vencimentos em uma única chamada vetorizada.
+        premiums = black_scholes_price_vec(
+            price, [call_strike, put_strike], T_years[:, np.newaxis], self.r, [call_iv, put_iv], [True, False]
+        ).tolist()
+        signals_list = [None] * len(expirations)
+        for i, (exp, (premium_call, premium_put)) in enumerate(zip(expirations, premiums)):
             total_premium = premium_call + premium_put
             leg_premiums = {"sell_call": premium_call, "sell_put": premium_put}
             qty_call = default_qty
@@ -864,63 +1397,23 @@ class OptionStrategyBot:
             risk = max(risk_call, risk_put)
             margin = risk - total_premium
 
-            if self.api_connected:
-                margin_percent = (margin / price) * 100
-                if margin_percent > 55:
-                    signal = {
-                        "asset": asset,
-                        "strategy": "No Trade - 16 Delta Short Strangle",
-                        "expiration": exp,
-                        "premium": total_premium,
-                        "leg_premiums": leg_premiums,
-                        "rationale": f"NOT POSSIBLE: REQUIRED MM {margin_percent:.1f}% exceeds 55%."
-                    }
-                    roll_instruction = ""
-                else:
-                    roll_instruction = "Rolagem: Iniciar rolagem 21 dias antes do vencimento."
-                    signal = {
-                        "asset": asset,
-                        "strategy": "16 Delta Short Strangle",
-                        "sell_call": {"strike": call_strike, "iv": call_iv, "symbol": f"{asset}_CALL_16D", "quantity": qty_call},
-                        "sell_put": {"strike": put_strike, "iv": put_iv, "symbol": f"{asset}_PUT_16D", "quantity": qty_put},
-                        "expiration": exp,
-                        "premium": total_premium,
-                        "leg_premiums": leg_premiums,
-                        "rationale": (
-                            "16 Delta Short Strangle: Venda de call e put com delta ~16, vencimento de 45 dias "
-                            "(ou diversificação 5 dias antes/depois), rolagem 21 dias antes, "
-                            "margem conforme VI e ROI de 65% para realização de lucros."
-                        ),
-                    }
-            else:
-                available_margin = 70 if asset in ["BTC", "ETH"] else 130
-                if margin > available_margin:
-                    signal = {
-                        "asset": asset,
-                        "strategy": "No Trade - 16 Delta Short Strangle",
-                        "expiration": exp,
-                        "premium": total_premium,
-                        "leg_premiums": leg_premiums,
-                        "rationale": f"NOT POSSIBLE: REQUIRED MARGIN ${margin:.2f}, AVAILABLE ${available_margin:.2f}."
-                    }
-                    roll_instruction = ""
-                else:
-                    roll_instruction = "Rolagem: Iniciar rolagem 21 dias antes do vencimento."
-                    signal = {
-                        "asset": asset,
-                        "strategy": "16 Delta Short Strangle",
-                        "sell_call": {"strike": call_strike, "iv": call_iv, "symbol": f"{asset}_CALL_16D", "quantity": qty_call},
-                        "sell_put": {"strike": put_strike, "iv": put_iv, "symbol": f"{asset}_PUT_16D", "quantity": qty_put},
-                        "expiration": exp,
-                        "premium": total_premium,
-                        "leg_premiums": leg_premiums,
-                        "rationale": (
-                            "16 Delta Short Strangle: Venda de call e put com delta ~16, vencimento de 45 dias "
-                            "(ou diversificação 5 dias antes/depois), rolagem 21 dias antes, "
-                            "margem conforme VI e ROI de 65% para realização de lucros."
-                        ),
-                    }
-            signals_list.append((signal, roll_instruction))
+            ok, reason = self._check_margin(asset, margin, price)
+            roll_instruction = self.ROLL_16D_SHORT_STRANGLE if ok else ""
+            signal = self._build_signal(
+                asset,
+                "16 Delta Short Strangle",
+                exp,
+                total_premium,
+                leg_premiums,
+                {
+                    "sell_call": {"strike": call_strike, "iv": call_iv, "symbol": call_symbol, "quantity": qty_call},
+                    "sell_put": {"strike": put_strike, "iv": put_iv, "symbol": put_symbol, "quantity": qty_put},
+                },
+                self.RATIONALE_16D_SHORT_STRANGLE,
+                ok,
+                reason,
+            )
+            signals_list[i] = (signal, roll_instruction)
         return signals_list
 
     def run(self):
@@ -931,20 +1424,40 @@ class OptionStrategyBot:
         :return: Dicionário com os sinais gerados, onde cada chave é um ativo e o valor é um dicionário
                  com cada estratégia contendo uma lista de tuplas (sinal, roll_instruction).
         """
-        signals = {}
-        for asset in self.assets:
-            print(f"\n=== Análise do ativo: {asset}/{self.quote_currency} ===")
-            short_strangle_signals = self.analyze_and_generate_short_strangle(asset)
-            bull_call_signals = self.analyze_and_generate_bull_call_spread(asset)
-            bear_put_signals = self.analyze_and_generate_bear_put_spread(asset)
-            delta16_signals = self.analyze_and_generate_16delta_short_strangle(asset)
-            signals[asset] = {
-                "short_strangle": short_strangle_signals,
-                "bull_call_spread": bull_call_signals,
-                "bear_put_spread": bear_put_signals,
-                "16_delta_short_strangle": delta16_signals,
+        # Os vencimentos fixos (e seus T) são os mesmos para todos os ativos: calculados uma única vez.
+        fixed_expirations = self.fixed_expirations()
+        # Os sinais ativos são carregados com uma única consulta e consultados em memória pelas estratégias.
+        self._active_keys = self.db.load_active_keys() if self.db is not None else None
+        try:
+            # Os ativos são independentes: cada um é analisado em sua própria thread.
+            with ThreadPoolExecutor(max_workers=min(8, len(self.assets))) as executor:
+                results = executor.map(lambda asset: self.analyze_asset(asset, fixed_expirations), self.assets)
+                return dict(zip(self.assets, results))
+        finally:
+            self._active_keys = None
+
+    def analyze_asset(self, asset, fixed_expirations=None):
+        """
+        Gera os sinais de todas as estratégias para um único ativo.
+
+        :param asset: Nome do ativo (ex: 'BTC').
+        :param fixed_expirations: Vencimentos fixos da estratégia 16 Delta (ver `fixed_expirations`).
+        :return: Dicionário com cada estratégia contendo uma lista de tuplas (sinal, roll_instruction).
+        """
+        logger.info("=== Análise do ativo: %s/%s ===", asset, self.quote_currency)
+        # O preço é obtido uma única vez e compartilhado por todas as estratégias do ativo.
+        price = self.fetch_underlying_price(asset)
+        if price is None:
+            return {
+                "short_strangle": [],
+                "bull_call_spread": [],
+                "bear_put_spread": [],
+                "16_delta_short_strangle": [],
             }
-            time.sleep(1)  # Pequeno delay para evitar rate limits
+        signals = self.analyze_all_strategies(asset, price)
+        signals["16_delta_short_strangle"] = self.analyze_and_generate_16delta_short_strangle(
+            asset, fixed_expirations, price
+        )
         return signals
 
 
@@ -953,51 +1466,108 @@ if __name__ == "__main__":
     # Defina API_KEY e API_SECRET se desejar utilizar endpoints privados; caso contrário, deixe como None
     API_KEY = None
     API_SECRET = None
-
-    bot = OptionStrategyBot(API_KEY, API_SECRET, quote_currency="USDT", r=0.01)
-    db = SignalDatabase("signals.db")
-
-    while True:
-        try:
-            results = bot.run()
-            print("\n=== Sinais de Entrada Gerados ===")
-            for asset, strategies in results.items():
-                # Para cada estratégia do ativo, iteramos sobre cada sinal gerado (para cada vencimento)
-                for strat_name, signals_list in strategies.items():
-                    for signal, roll_instruction in signals_list:
-                        # Se o sinal for de "No Trade" ou "Erro", exibe os detalhes (não são gravados)
-                        if ("No Trade" in signal["strategy"]) or ("Erro" in signal["strategy"]):
-                            print("-" * 80)
-                            print(f"\nEstratégia: {strat_name} - {signal.get('asset', asset)}")
-                            for key, value in signal.items():
-                                print(f"{key}: {value}")
-                        else:
-                            # Para sinais válidos, tenta inseri-los no banco
-                            signal_id = db.insert_signal(
-                                asset,
-                                signal["strategy"],
-                                signal.get("expiration", ""),
-                                signal.get("premium", 0),
-                                signal,
-                                roll_instruction,
-                            )
-                            if signal_id is None:
-                                print(f"\nSinal para {asset} - {signal['strategy']} com expiração {signal.get('expiration', '')} já existe.")
+    # Avisos e erros vão para o log (stderr); mensagens informativas (ex.: início da análise de cada ativo)
+    # só são formatadas e exibidas com BOT_LOG_LEVEL=INFO. Sinais e notificações continuam no stdout.
+    logging.basicConfig(
+        level=os.environ.get("BOT_LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    # Periodicidades (em segundos): a geração de sinais e a verificação de rolagem têm cadências próprias.
+    ANALYSIS_INTERVAL = 300
+    ROLL_CHECK_INTERVAL = 60
+    # Com BOT_VERBOSE=1 cada campo do sinal é exibido em uma linha; por padrão, o sinal é exibido em uma única linha JSON.
+    VERBOSE = os.environ.get("BOT_VERBOSE", "0") == "1"
+
+    # O laço de rolagem chama `db.checkpoint()` a cada verificação.
+    db = SignalDatabase("signals.db", manual_checkpoint=True)
+    bot = OptionStrategyBot(API_KEY, API_SECRET, quote_currency="USDT", r=0.01, db=db)
+
+    # SIGTERM (ex.: `docker stop`) interrompe a espera entre ciclos e encerra o robô.
+    stop_event = threading.Event()
+    os_signal.signal(os_signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    # Os horários das próximas execuções são ancorados na agenda (próximo = anterior + intervalo), e não no
+    # fim da execução anterior: a duração de cada ciclo não se acumula como atraso. Execuções perdidas
+    # (ciclo mais longo que o intervalo) são descartadas em vez de executadas em sequência.
+
+    def roll_check_loop():
+        """
+        Verificação de rolagem em thread própria, a cada ROLL_CHECK_INTERVAL segundos: por acessar apenas o
+        banco, não precisa aguardar a geração de sinais (limitada pelas requisições à exchange).
+        """
+        next_roll_check = time.monotonic()
+        while not stop_event.is_set():
+            try:
+                if notifications := db.check_roll_signals(roll_threshold_days=2, profit_threshold=0.75):
+                    # Uma única escrita no stdout, para não se intercalar com a saída da geração de sinais.
+                    sys.stdout.write("\n".join(["\n=== Notificações de Rolagem ===", *notifications]) + "\n")
+                # As escritas do período (sinais e rolagens) são levadas do WAL para o banco neste ponto.
+                db.checkpoint()
+            except Exception as e:
+                logger.error("Erro na verificação de rolagem: %s", e)
+            while next_roll_check <= time.monotonic():
+                next_roll_check += ROLL_CHECK_INTERVAL
+            stop_event.wait(timeout=max(0.0, next_roll_check - time.monotonic()))
+
+    roll_thread = threading.Thread(target=roll_check_loop, name="roll-check")
+    roll_thread.start()
+
+    try:
+        next_analysis = time.monotonic()
+        while not stop_event.is_set():
+            # Geração de sinais: a cada ANALYSIS_INTERVAL segundos.
+            if time.monotonic() >= next_analysis:
+                while next_analysis <= time.monotonic():
+                    next_analysis += ANALYSIS_INTERVAL
+                try:
+                    results = bot.run()
+                    entries = []
+                    rows = []
+                    for asset, strategies in results.items():
+                        # Para cada estratégia do ativo, iteramos sobre cada sinal gerado (para cada vencimento)
+                        for strat_name, signals_list in strategies.items():
+                            for signal, roll_instruction in signals_list:
+                                # Sinais de "No Trade" ou "Erro" apenas são exibidos (não são gravados)
+                                valid = not signal["strategy"].startswith(("No Trade", "Erro"))
+                                entries.append((asset, strat_name, signal, valid))
+                                if valid:
+                                    rows.append(
+                                        (
+                                            asset,
+                                            signal["strategy"],
+                                            signal.get("expiration", ""),
+                                            signal.get("premium", 0),
+                                            signal,
+                                            roll_instruction,
+                                        )
+                                    )
+                    # Todas as inserções do ciclo são gravadas em lote, em uma única transação (um único commit).
+                    # A saída do ciclo é acumulada e escrita no stdout de uma só vez.
+                    lines = ["\n=== Sinais de Entrada Gerados ==="]
+                    with db.transaction():
+                        signal_ids = iter(db.insert_signals_bulk(rows))
+                        leg_rows = []
+                        for asset, strat_name, signal, valid in entries:
+                            signal_id = next(signal_ids) if valid else None
+                            if valid and signal_id is None:
+                                lines.append(f"\nSinal para {asset} - {signal['strategy']} com expiração {signal.get('expiration', '')} já existe.")
+                                continue
+                            lines.append("-" * 80)
+                            lines.append(f"\nEstratégia: {strat_name} - {signal.get('asset', asset)}")
+                            if VERBOSE:
+                                lines.extend(f"{key}: {value}" for key, value in signal.items())
                             else:
-                                print("-" * 80)
-                                print(f"\nEstratégia: {strat_name} - {signal.get('asset', asset)}")
-                                for key, value in signal.items():
-                                    print(f"{key}: {value}")
-                                db.insert_signal_legs(
-                                    signal_id, signal, bot.asset_min_qty.get(asset, 0.01)
-                                )
-        except Exception as e:
-            print(f"Erro na execução do robô: {e}")
-
-        if notifications := db.check_roll_signals(roll_threshold_days=2, profit_threshold=0.75):
-            print("\n=== Notificações de Rolagem ===")
-            for note in notifications:
-                print(note)
-
-        # Aguarda 5 minutos antes da próxima verificação
-        time.sleep(300)
+                                lines.append(serialize_signal(signal).decode())
+                            if valid:
+                                leg_rows.extend(db.leg_rows(signal_id, signal, bot.asset_min_qty.get(asset, 0.01)))
+                        db.insert_signal_legs_bulk(leg_rows)
+                    sys.stdout.write("\n".join(lines) + "\n")
+                except Exception as e:
+                    logger.error("Erro na execução do robô: %s", e)
+
+            # Aguarda até a próxima geração de sinais (ou até receber SIGTERM)
+            stop_event.wait(timeout=max(0.0, next_analysis - time.monotonic()))
+    finally:
+        # Encerramento (SIGTERM ou Ctrl+C): interrompe também a thread de rolagem.
+        stop_event.set()
+        roll_thread.join()